@@ -1,7 +1,12 @@
 """Set up the Wiener Netze SmartMeter Integration component."""
 from homeassistant import core, config_entries
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
 from homeassistant.core import DOMAIN
 
+from .api import Smartmeter
+from .const import SCAN_INTERVAL
+from .coordinator import WnsmCoordinator
+
 
 async def async_setup_entry(
         hass: core.HomeAssistant,
@@ -9,7 +14,13 @@ async def async_setup_entry(
 ) -> bool:
     """Set up platform from a ConfigEntry."""
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = entry.data
+    # All sensors share one coordinator, thus one session and one query per interval.
+    # The first refresh happens here, as only async_setup_entry retries the setup on ConfigEntryNotReady
+    coordinator = WnsmCoordinator(
+        hass, Smartmeter(entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD]), SCAN_INTERVAL
+    )
+    await coordinator.async_config_entry_first_refresh()
+    hass.data[DOMAIN][entry.entry_id] = coordinator
 
     # Forward the setup to the sensor platform.
     hass.async_create_task(
@@ -8,7 +8,9 @@ from lxml import html
 
 from . import constants as const
 from .errors import (
+    SmartmeterApiError,
     SmartmeterConnectionError,
+    SmartmeterTransportError,
     SmartmeterLoginError,
     SmartmeterQueryError,
 )
@@ -141,9 +143,16 @@ class Smartmeter:
         )
         return self
 
+    def is_login_expired(self):
+        """Returns True if there is no access token or it is not valid anymore."""
+        return (
+            self._access_token_expiration is None
+            or datetime.now() >= self._access_token_expiration
+        )
+
     def _access_valid_or_raise(self):
         """Checks if the access token is still valid or raises an exception"""
-        if datetime.now() >= self._access_token_expiration:
+        if self.is_login_expired():
             # TODO: If the refresh token is still valid, it could be refreshed here
             raise SmartmeterConnectionError(
                 "Access Token is not valid anymore, please re-log!"
@@ -224,14 +233,40 @@ class Smartmeter:
         if data:
             headers["Content-Type"] = "application/json"
 
-        response = self.session.request(
-            method, url, headers=headers, json=data, timeout=timeout
-        )
+        try:
+            response = self.session.request(
+                method, url, headers=headers, json=data, timeout=timeout
+            )
+        except Exception as exception:
+            raise SmartmeterTransportError(
+                f"Could not call API endpoint {endpoint}"
+            ) from exception
+
+        if response.status_code in (401, 403):
+            raise SmartmeterConnectionError(
+                f"Access to API endpoint {endpoint} was denied, please re-log!",
+                code=response.status_code,
+                error_response=response.text,
+            )
 
         if return_response:
             return response
 
-        return response.json()
+        try:
+            result = response.json()
+        except ValueError as exception:
+            raise SmartmeterApiError(
+                f"API endpoint {endpoint} did not return JSON",
+                code=response.status_code,
+                error_response=response.text,
+            ) from exception
+        if not response.ok or (isinstance(result, dict) and "Exception" in result):
+            raise SmartmeterApiError(
+                f"API endpoint {endpoint} returned an error: {result}",
+                code=response.status_code,
+                error_response=result,
+            )
+        return result
 
     def _get_first_zaehlpunkt(self):
         return self.zaehlpunkte()[0]["zaehlpunkte"][0]["zaehlpunktnummer"]
@@ -283,6 +318,35 @@ class Smartmeter:
         }
         return self._call_api(endpoint, query=query)
 
+    def verbrauch_range(
+        self,
+        date_from: datetime,
+        date_to: datetime,
+        zaehlpunkt: str | None = None,
+        resolution: const.Resolution = const.Resolution.HOUR,
+    ):
+        """Returns energy usage between date_from and date_to.
+        In contrast to verbrauch, several days can be queried with a single request.
+        Args:
+            date_from (datetime): Start date for energy usage request
+            date_to (datetime): End date for energy usage request
+            zaehlpunkt (str, optional): Id for desired smartmeter.
+                If None, check for first meter in user profile.
+            resolution (const.Resolution, optional): Specify either 1h or 15min resolution
+        Returns:
+            dict: JSON response of api call to
+                'messdaten/zaehlpunkt/ZAEHLPUNKT/verbrauchRaw'
+        """
+        if zaehlpunkt is None:
+            zaehlpunkt = self._get_first_zaehlpunkt()
+        endpoint = f"messdaten/zaehlpunkt/{zaehlpunkt}/verbrauchRaw"
+        query = {
+            "dateFrom": self._dt_string(date_from),
+            "dateTo": self._dt_string(date_to),
+            "granularity": resolution.value,
+        }
+        return self._call_api(endpoint, query=query)
+
     def verbrauch(
         self,
         date_from: datetime,
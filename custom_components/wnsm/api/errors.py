@@ -29,3 +29,11 @@ class SmartmeterConnectionError(SmartmeterError):
 
 class SmartmeterQueryError(SmartmeterError):
     """Raised if query went not as expected."""
+
+
+class SmartmeterApiError(SmartmeterError):
+    """Raised if the API responds with an error."""
+
+
+class SmartmeterTransportError(SmartmeterError):
+    """Raised if a request to the API fails on the network level (e.g. timeout), the session might still be valid."""
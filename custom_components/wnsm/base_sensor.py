@@ -1,8 +1,9 @@
+import asyncio
 import logging
 from abc import ABC
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Optional
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -11,35 +12,38 @@ from homeassistant.components.sensor import (
     ENTITY_ID_FORMAT
 )
 from homeassistant.const import UnitOfEnergy
-from homeassistant.util import slugify
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util, slugify
 
 from .api import Smartmeter
+from .api.errors import SmartmeterConnectionError
+from .cache import ConsumptionCache
+from .coordinator import WnsmCoordinator
 from .const import (
-    ATTRS_BASEINFORMATION_CALL,
-    ATTRS_CONSUMPTIONS_CALL,
-    ATTRS_METERREADINGS_CALL,
-    ATTRS_ZAEHLPUNKTE_CALL,
     ATTRS_VERBRAUCH_CALL,
     ATTRS_HISTORIC_DATA,
+    CONSUMPTION_CACHE_MAX_AGE,
+    CONSUMPTION_CACHE_MIN_AGE,
 )
-from .utils import translate_dict
+from .utils import parse_timestamp, translate_dict
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class BaseSensor(SensorEntity, ABC):
+class BaseSensor(CoordinatorEntity[WnsmCoordinator], SensorEntity, ABC):
     """
     Representation of a Wiener Smartmeter sensor
     for measuring total increasing energy consumption for a specific zaehlpunkt
+    Data shared between sensors is fetched by the coordinator,
+    every coordinator update triggers an update of the sensor
     """
 
     def _icon(self) -> str:
         return "mdi:flash"
 
-    def __init__(self, username: str, password: str, zaehlpunkt: str) -> None:
-        super().__init__()
-        self.username = username
-        self.password = password
+    def __init__(self, coordinator: WnsmCoordinator, zaehlpunkt: str) -> None:
+        super().__init__(coordinator)
         self.zaehlpunkt = zaehlpunkt
 
         self._attr_native_value = int
@@ -56,6 +60,7 @@ class BaseSensor(SensorEntity, ABC):
         self._state: int | str | None = None
         self._available: bool = True
         self._updatets: str | None = None
+        self._consumption_cache: ConsumptionCache | None = None
 
     @property
     def _id(self):
@@ -80,85 +85,131 @@ class BaseSensor(SensorEntity, ABC):
     @property
     def available(self) -> bool:
         """Return True if entity is available."""
-        return self._available
+        return super().available and self._available
 
     @property
     def state(self) -> Optional[str]:  # pylint: disable=overridden-final-method
         return self._state
 
-    async def get_zaehlpunkt(self, smartmeter: Smartmeter) -> dict[str, str]:
-        """
-        asynchronously get and parse /zaehlpunkt response
-        Returns response already sanitzied of the specified zahlpunkt in ctor
-        """
-        zps = await self.hass.async_add_executor_job(smartmeter.zaehlpunkte)
-        if zps is None or len(zps) == 0:
-            raise RuntimeError(f"Cannot access Zaehlpunkt {self.zaehlpunkt}")
-        if zps is not None and isinstance(zps, list) and len(zps) > 0 and "zaehlpunkte" in zps[0]:
-            zaehlpunkt = [
-                z for z in zps[0]["zaehlpunkte"] if z["zaehlpunktnummer"] == self.zaehlpunkt
-            ]
-        else:
-            zaehlpunkt = []
-        
-        if len(zaehlpunkt) == 0:
-            raise RuntimeError(f"Zaehlpunkt {self.zaehlpunkt} not found")
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self.async_schedule_update_ha_state(force_refresh=True)
 
-        return (
-            translate_dict(zaehlpunkt[0], ATTRS_ZAEHLPUNKTE_CALL)
-            if len(zaehlpunkt) > 0
-            else None
-        )
-
-    async def get_consumption(self, smartmeter: Smartmeter, start_date: datetime):
-        """Return 24h of hourly consumption starting from a date"""
-        response = await self.hass.async_add_executor_job(
-            smartmeter.verbrauch, start_date, self.zaehlpunkt
-        )
-        if "Exception" in response:
-            raise RuntimeError(f"Cannot access daily consumption: {response}")
+    async def with_smartmeter(self, func: Callable[[Smartmeter], Awaitable[None]]) -> None:
+        """
+        calls func with a logged-in client
+        If the session turns out to be invalid, logs in again and retries once
+        """
+        smartmeter = await self.coordinator.async_login()
+        try:
+            await func(smartmeter)
+        except SmartmeterConnectionError as exception:
+            _LOGGER.debug("Retrying with a new session: %s", exception)
+            await func(await self.coordinator.async_login(force_login=True))
+
+    def get_zaehlpunkt(self) -> dict[str, str]:
+        """
+        Returns the zaehlpunkt specified in ctor, as fetched by the coordinator
+        """
+        zaehlpunkte = self.coordinator.data["zaehlpunkte"] if self.coordinator.data else {}
+        zaehlpunkt = zaehlpunkte.get(self.zaehlpunkt)
+        if zaehlpunkt is None:
+            raise RuntimeError(f"Zaehlpunkt {self.zaehlpunkt} not found")
+        return zaehlpunkt
 
-        return translate_dict(response, ATTRS_VERBRAUCH_CALL)
+    async def _get_consumption_cache(self) -> ConsumptionCache:
+        if self._consumption_cache is None:
+            self._consumption_cache = ConsumptionCache(self.hass, self.zaehlpunkt)
+            await self._consumption_cache.async_evict(
+                dt_util.utcnow() - timedelta(days=CONSUMPTION_CACHE_MAX_AGE)
+            )
+        return self._consumption_cache
 
-    async def get_historic_data(self, smartmeter: Smartmeter):
-        """Return three years of historic quarter-hourly data"""
-        response = await self.hass.async_add_executor_job(
-            smartmeter.historical_data, self.zaehlpunkt,
+    async def get_consumption(self, smartmeter: Smartmeter, start_date: datetime, end_date: datetime):
+        """
+        Return hourly consumption from start_date up to (excluding) end_date
+        Consumption of days which are old enough is not going to change anymore,
+        thus it is cached per hour and served from the cache if all hours of the range are cached
+        """
+        cache = await self._get_consumption_cache()
+        consumption = await cache.async_get(start_date, end_date)
+        if consumption is not None:
+            return consumption
+
+        consumption = None
+        if self.coordinator.verbrauch_range_hourly:
+            # dateTo is inclusive, thus stop right before the end
+            response = await self.coordinator.async_call_api(
+                smartmeter.verbrauch_range,
+                start_date,
+                end_date - timedelta(seconds=1),
+                self.zaehlpunkt,
+            )
+            consumption = translate_dict(response, ATTRS_VERBRAUCH_CALL)
+            if not self.is_hourly(consumption, start_date, end_date):
+                _LOGGER.warning(
+                    "verbrauchRaw did not return hourly values from %s to %s, querying each day instead",
+                    start_date, end_date
+                )
+                self.coordinator.verbrauch_range_hourly = False
+                consumption = None
+        if consumption is None:
+            consumption = await self.get_consumption_per_day(smartmeter, start_date, end_date)
+
+        await cache.async_set(
+            start_date, end_date, consumption, dt_util.utcnow() - timedelta(days=CONSUMPTION_CACHE_MIN_AGE)
         )
-        if "Exception" in response:
-            raise RuntimeError(f"Cannot access historic data: {response}")
-
-        return translate_dict(response, ATTRS_HISTORIC_DATA)
+        return consumption
 
-    async def get_base_information(self, smartmeter: Smartmeter) -> dict[str, str]:
+    async def get_consumption_per_day(self, smartmeter: Smartmeter, start_date: datetime, end_date: datetime):
         """
-        asynchronously get and parse /baseInformation response
-        Returns response already sanitized of the specified zaehlpunkt in ctor
+        Return hourly consumption from start_date up to (excluding) end_date,
+        querying 24h at a time with the verbrauch endpoint
         """
-        response = await self.hass.async_add_executor_job(smartmeter.base_information)
-        if "Exception" in response:
-            raise RuntimeError("Cannot access /baseInformation: ", response)
-        return translate_dict(response, ATTRS_BASEINFORMATION_CALL)
+        days = []
+        day = start_date
+        while day < end_date:
+            days.append(day)
+            day += timedelta(hours=24)
+        responses = await asyncio.gather(
+            *(self.coordinator.async_call_api(smartmeter.verbrauch, day, self.zaehlpunkt) for day in days)
+        )
+        consumptions = [translate_dict(response, ATTRS_VERBRAUCH_CALL) for response in responses]
+        opt_ins = [c.get("optIn") for c in consumptions]
+        consumption = {
+            "values": [
+                v for c in consumptions for v in c.get("values", [])
+                if parse_timestamp(v["timestamp"]) < end_date
+            ],
+        }
+        if all(opt_in is True for opt_in in opt_ins):
+            consumption["optIn"] = True
+        elif any(opt_in is False for opt_in in opt_ins):
+            consumption["optIn"] = False
+        return consumption
 
-    async def get_consumptions(self, smartmeter: Smartmeter) -> dict[str, str]:
+    @staticmethod
+    def is_hourly(consumption: dict, start_date: datetime, end_date: datetime) -> bool:
         """
-        asynchronously get and parse /consumptions response
-        Returns response already sanitized of the specified zaehlpunkt in ctor
+        returns whether the consumption (with opt-in) contains exactly one value per hour
+        from start_date up to (excluding) end_date
+        Without opt-in, hourly values are not expected anyway
         """
-        response = await self.hass.async_add_executor_job(smartmeter.consumptions)
-        if "Exception" in response:
-            raise RuntimeError("Cannot access /consumptions: ", response)
-        return translate_dict(response, ATTRS_CONSUMPTIONS_CALL)
+        if consumption.get("optIn") is not True or "values" not in consumption:
+            return True
+        expected = start_date
+        for v in consumption["values"]:
+            if parse_timestamp(v["timestamp"]) != expected:
+                return False
+            expected += timedelta(hours=1)
+        return expected == end_date
 
-    async def get_meter_readings(self, smartmeter: Smartmeter) -> dict[str, any]:
+    async def get_historic_data(self, smartmeter: Smartmeter):
         """
-        asynchronously get and parse /meterReadings response
-        Returns response already sanitized of the specified zaehlpunkt in ctor
+        Return three years of historic quarter-hourly data
         """
-        response = await self.hass.async_add_executor_job(smartmeter.meter_readings)
-        if "Exception" in response:
-            raise RuntimeError("Cannot access /meterReadings: ", response)
-        return translate_dict(response, ATTRS_METERREADINGS_CALL)
+        response = await self.coordinator.async_call_api(smartmeter.historical_data, self.zaehlpunkt)
+        return translate_dict(response, ATTRS_HISTORIC_DATA)
 
     @staticmethod
     def is_active(zaehlpunkt_response: dict) -> bool:
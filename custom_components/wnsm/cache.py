@@ -0,0 +1,92 @@
+"""
+Persistent cache for API responses which do not change anymore
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .utils import parse_timestamp
+
+STORAGE_VERSION = 1
+# Delay (in seconds) for writing the cache to disk, to bundle several updates into one write
+SAVE_DELAY = 30
+
+HOUR = timedelta(hours=1)
+
+
+def _key(timestamp: datetime) -> str:
+    # keys are ISO timestamps in UTC, thus they compare like the timestamps themselves
+    return timestamp.astimezone(timezone.utc).isoformat()
+
+
+class ConsumptionCache:
+    """
+    Caches translated hourly consumption values of a zaehlpunkt by their (UTC) hour.
+    Responses of arbitrary ranges are assembled from the cached hours.
+    The cache is stored in .storage and survives restarts of Home Assistant.
+    """
+
+    def __init__(self, hass: HomeAssistant, zaehlpunkt: str) -> None:
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}_cache_{zaehlpunkt}")
+        self._data: dict[str, dict[str, Any]] | None = None
+
+    async def _async_load(self) -> dict[str, dict[str, Any]]:
+        if self._data is None:
+            data = await self._store.async_load()
+            # another caller might have been faster
+            if self._data is None:
+                self._data = data or {}
+        return self._data
+
+    def _schedule_save(self) -> None:
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY)
+
+    async def async_get(self, start: datetime, end: datetime) -> dict[str, Any] | None:
+        """
+        returns the consumption of all hours from start up to (excluding) end
+        or None, if not all of them are cached
+        """
+        data = await self._async_load()
+        values = []
+        hour = start
+        while hour < end:
+            value = data.get(_key(hour))
+            if value is None:
+                return None
+            values.append(value)
+            hour += HOUR
+        return {"optIn": True, "values": values}
+
+    async def async_set(self, start: datetime, end: datetime, consumption: dict[str, Any], until: datetime) -> None:
+        """
+        caches all values of the consumption from start up to (excluding) end, which are before until
+        Only consumption with opt-in is cached, as only that contains hourly values
+        """
+        if consumption.get("optIn") is not True or "values" not in consumption:
+            return
+        data = await self._async_load()
+        end = min(end, until)
+        changed = False
+        for v in consumption["values"]:
+            timestamp = parse_timestamp(v["timestamp"])
+            if start <= timestamp < end:
+                data[_key(timestamp)] = v
+                changed = True
+        if changed:
+            self._schedule_save()
+
+    async def async_evict(self, before: datetime) -> None:
+        """
+        removes all hours before the given datetime
+        """
+        data = await self._async_load()
+        before_key = _key(before)
+        expired = [k for k in data if k < before_key]
+        for key in expired:
+            del data[key]
+        if expired:
+            self._schedule_save()
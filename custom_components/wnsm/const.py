@@ -1,10 +1,30 @@
 """
     component constants
 """
+from datetime import timedelta
+
 DOMAIN = "wnsm"
 
+# Time between updating data from Wiener Netze
+SCAN_INTERVAL = timedelta(minutes=60)
+
 CONF_ZAEHLPUNKTE = "zaehlpunkte"
 
+# Limits for querying the API, to not get throttled during imports
+API_RATE_LIMIT = 2  # requests per second
+API_MAX_BURST = 2
+API_MAX_CONCURRENT = 5
+# Retries (with exponential backoff, starting at the given delay in seconds) if the API responds with an error
+API_RETRIES = 3
+API_RETRY_DELAY = 1
+
+# Consumption older than this (in days) is not going to change anymore and can be cached
+CONSUMPTION_CACHE_MIN_AGE = 2
+# The API serves three years of consumption, older days are removed from the cache
+CONSUMPTION_CACHE_MAX_AGE = 3 * 365
+# Metadata of the zaehlpunkte (labels, addresses, ...) rarely changes, thus it is only queried every few hours
+ZAEHLPUNKTE_CACHE_TTL = 3 * 60 * 60  # seconds
+
 ATTRS_ZAEHLPUNKT_CALL = [
     ("zaehlpunktnummer", "zaehlpunktnummer"),
     ("customLabel", "label"),
@@ -0,0 +1,142 @@
+"""
+Coordinator fetching the data shared by all sensors of one account
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Callable, TypeVar
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .api import Smartmeter
+from .api.errors import (
+    SmartmeterApiError,
+    SmartmeterConnectionError,
+    SmartmeterError,
+    SmartmeterTransportError,
+)
+from .const import (
+    API_MAX_BURST,
+    API_MAX_CONCURRENT,
+    API_RATE_LIMIT,
+    API_RETRIES,
+    API_RETRY_DELAY,
+    ATTRS_BASEINFORMATION_CALL,
+    ATTRS_CONSUMPTIONS_CALL,
+    ATTRS_METERREADINGS_CALL,
+    ATTRS_ZAEHLPUNKTE_CALL,
+    DOMAIN,
+    ZAEHLPUNKTE_CACHE_TTL,
+)
+from .utils import RateLimiter, translate_dict, ttl_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WnsmCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+    """
+    Logs in once and queries the account-wide endpoints once per update interval,
+    regardless of the number of sensors
+    """
+
+    def __init__(self, hass: HomeAssistant, smartmeter: Smartmeter, update_interval: timedelta) -> None:
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=update_interval)
+        self.smartmeter = smartmeter
+        self._login_lock = asyncio.Lock()
+        # All sensors of the account share the session, thus the API limits are shared as well
+        self._rate_limiter = RateLimiter(API_RATE_LIMIT, API_MAX_BURST, API_MAX_CONCURRENT)
+        # Cleared once verbrauchRaw returns anything but hourly values, see BaseSensor.get_consumption
+        self.verbrauch_range_hourly = True
+
+    async def async_login(self, force_login: bool = False) -> Smartmeter:
+        """
+        returns the shared client, logging in only if there is no valid session
+        """
+        async with self._login_lock:
+            if force_login or self.smartmeter.is_login_expired():
+                await self.hass.async_add_executor_job(self.smartmeter.login)
+        return self.smartmeter
+
+    @staticmethod
+    def is_transient(exception: SmartmeterError) -> bool:
+        """
+        returns whether retrying might help, i.e. for network failures, server errors and throttling
+        Other errors (e.g. 400 or 404) are going to be returned again
+        """
+        if isinstance(exception, SmartmeterTransportError):
+            return True
+        return exception.code == 429 or exception.code >= 500
+
+    async def async_call_api(self, func: Callable[..., T], *args) -> T:
+        """
+        calls a (blocking) function of the client in the executor
+        If the API cannot be reached or responds with a transient error, retries with exponential backoff
+        Every attempt waits for the rate limiter, which is not held while backing off
+        """
+        for attempt in range(API_RETRIES):
+            try:
+                async with self._rate_limiter:
+                    return await self.hass.async_add_executor_job(func, *args)
+            except (SmartmeterApiError, SmartmeterTransportError) as exception:
+                if attempt == API_RETRIES - 1 or not self.is_transient(exception):
+                    raise
+                delay = API_RETRY_DELAY * 2 ** attempt
+                _LOGGER.debug("API error, retrying in %ss: %s", delay, exception)
+                await asyncio.sleep(delay)
+
+    async def _async_update_data(self) -> dict[str, Any]:
+        try:
+            try:
+                return await self._async_fetch(await self.async_login())
+            except SmartmeterConnectionError as exception:
+                _LOGGER.debug("Retrying with a new session: %s", exception)
+                return await self._async_fetch(await self.async_login(force_login=True))
+        except (SmartmeterError, RuntimeError) as exception:
+            raise UpdateFailed(f"Error retrieving data from smart meter api: {exception}") from exception
+
+    async def _async_fetch(self, smartmeter: Smartmeter) -> dict[str, Any]:
+        return {
+            "zaehlpunkte": await self.get_zaehlpunkte(smartmeter),
+            "consumptions": await self.get_consumptions(smartmeter),
+            "base_information": await self.get_base_information(smartmeter),
+            "meter_readings": await self.get_meter_readings(smartmeter),
+        }
+
+    @ttl_cache(ZAEHLPUNKTE_CACHE_TTL)
+    async def get_zaehlpunkte(self, smartmeter: Smartmeter) -> dict[str, dict[str, str]]:
+        """
+        asynchronously get and parse /zaehlpunkte response
+        Returns all zaehlpunkte of the account by their zaehlpunktnummer
+        As they rarely change, they are only queried every few hours
+        """
+        zps = await self.async_call_api(smartmeter.zaehlpunkte)
+        if zps is None or len(zps) == 0:
+            raise RuntimeError("Cannot access /zaehlpunkte: ", zps)
+        return {
+            z["zaehlpunktnummer"]: translate_dict(z, ATTRS_ZAEHLPUNKTE_CALL)
+            for z in zps[0].get("zaehlpunkte", [])
+        }
+
+    async def get_base_information(self, smartmeter: Smartmeter) -> dict[str, str]:
+        """
+        asynchronously get and parse /baseInformation response
+        """
+        response = await self.async_call_api(smartmeter.base_information)
+        return translate_dict(response, ATTRS_BASEINFORMATION_CALL)
+
+    async def get_consumptions(self, smartmeter: Smartmeter) -> dict[str, str]:
+        """
+        asynchronously get and parse /consumptions response
+        """
+        response = await self.async_call_api(smartmeter.consumptions)
+        return translate_dict(response, ATTRS_CONSUMPTIONS_CALL)
+
+    async def get_meter_readings(self, smartmeter: Smartmeter) -> dict[str, any]:
+        """
+        asynchronously get and parse /meterReadings response
+        """
+        response = await self.async_call_api(smartmeter.meter_readings)
+        return translate_dict(response, ATTRS_METERREADINGS_CALL)
@@ -4,7 +4,9 @@ from datetime import datetime
 from homeassistant.components.sensor import SensorEntity
 
 from .api import Smartmeter
+from .api.errors import SmartmeterError
 from .base_sensor import BaseSensor
+from .coordinator import WnsmCoordinator
 from .utils import before, today
 
 _LOGGER = logging.getLogger(__name__)
@@ -16,81 +18,82 @@ class LiveSensor(BaseSensor, SensorEntity):
     for measuring total increasing energy consumption for a specific zaehlpunkt
     """
 
-    def __init__(self, username: str, password: str, zaehlpunkt: str) -> None:
-        super().__init__(username, password, zaehlpunkt)
+    def __init__(self, coordinator: WnsmCoordinator, zaehlpunkt: str) -> None:
+        super().__init__(coordinator, zaehlpunkt)
 
     async def get_daily_consumption(self, smartmeter: Smartmeter, date: datetime):
         """
         asynchronously get and parse /tages_verbrauch response
         Returns response already sanitzied of the specified zahlpunkt in ctor
         """
-        response = await self.hass.async_add_executor_job(
+        return await self.coordinator.async_call_api(
             smartmeter.tages_verbrauch, date, self.zaehlpunkt
         )
-        if "Exception" in response:
-            raise RuntimeError("Cannot access daily consumption: ", response)
-        return response
 
     async def async_update(self):
         """
         update sensor
         """
         try:
-            smartmeter = Smartmeter(self.username, self.password)
-            await self.hass.async_add_executor_job(smartmeter.login)
-            zaehlpunkt = await self.get_zaehlpunkt(smartmeter)
-            self._attr_extra_state_attributes = zaehlpunkt
+            await self.with_smartmeter(self._update)
+        except SmartmeterError as e:
+            self._available = False
+            _LOGGER.warning("Error retrieving data from smart meter api - Error: %s" % e)
+        except RuntimeError as e:
+            self._available = False
+            _LOGGER.exception("Error retrieving data from smart meter api - Error: %s" % e)
 
-            if self.is_active(zaehlpunkt):
-                consumptions = await self.get_consumptions(smartmeter)
-                base_information = await self.get_base_information(smartmeter)
-                meter_readings = await self.get_meter_readings(smartmeter)
-                # if zaehlpunkt is coincidentally the one returned by /welcome
+    async def _update(self, smartmeter: Smartmeter):
+        """
+        update sensor using a logged-in client
+        """
+        zaehlpunkt = self.get_zaehlpunkt()
+        self._attr_extra_state_attributes = zaehlpunkt
+
+        if self.is_active(zaehlpunkt):
+            consumptions = self.coordinator.data["consumptions"]
+            base_information = self.coordinator.data["base_information"]
+            meter_readings = self.coordinator.data["meter_readings"]
+            # if zaehlpunkt is coincidentally the one returned by /welcome
+            if (
+                    "zaehlpunkt" in base_information
+                    and base_information["zaehlpunkt"] == self.zaehlpunkt
+                    and "lastValue" in meter_readings
+            ):
+                if (
+                        meter_readings["lastValue"] is None
+                        or self._state != meter_readings["lastValue"]
+                ):
+                    self._state = meter_readings["lastValue"] / 1000
+            else:
+                # if not, we'll have to guesstimate (because api is shitty-pom-fritty)
+                # for that zaehlpunkt
+                yesterdays_consumption = await self.get_daily_consumption(
+                    smartmeter, before(today())
+                )
                 if (
-                        "zaehlpunkt" in base_information
-                        and base_information["zaehlpunkt"] == self.zaehlpunkt
-                        and "lastValue" in meter_readings
+                        "values" in yesterdays_consumption
+                        and "statistics" in yesterdays_consumption
                 ):
-                    if (
-                            meter_readings["lastValue"] is None
-                            or self._state != meter_readings["lastValue"]
-                    ):
-                        self._state = meter_readings["lastValue"] / 1000
+                    avg = yesterdays_consumption["statistics"]["average"]
+                    yesterdays_sum = sum(
+                        (
+                            y["value"] if y["value"] is not None else avg
+                            for y in yesterdays_consumption["values"]
+                        )
+                    )
+                    if yesterdays_sum > 0:
+                        self._state = yesterdays_sum
                 else:
-                    # if not, we'll have to guesstimate (because api is shitty-pom-fritty)
-                    # for that zaehlpunkt
-                    yesterdays_consumption = await self.get_daily_consumption(
-                        smartmeter, before(today())
+                    _LOGGER.error("Unable to load consumption")
+                    _LOGGER.error(
+                        "Please file an issue with this error and \
+                        (anonymized) payload in github %s %s %s %s",
+                        base_information,
+                        consumptions,
+                        meter_readings,
+                        yesterdays_consumption,
                     )
-                    if (
-                            "values" in yesterdays_consumption
-                            and "statistics" in yesterdays_consumption
-                    ):
-                        avg = yesterdays_consumption["statistics"]["average"]
-                        yesterdays_sum = sum(
-                            (
-                                y["value"] if y["value"] is not None else avg
-                                for y in yesterdays_consumption["values"]
-                            )
-                        )
-                        if yesterdays_sum > 0:
-                            self._state = yesterdays_sum
-                    else:
-                        _LOGGER.error("Unable to load consumption")
-                        _LOGGER.error(
-                            "Please file an issue with this error and \
-                            (anonymized) payload in github %s %s %s %s",
-                            base_information,
-                            consumptions,
-                            meter_readings,
-                            yesterdays_consumption,
-                        )
-                        return
-            self._available = True
-            self._updatets = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-        except TimeoutError as e:
-            self._available = False
-            _LOGGER.warning("Error retrieving data from smart meter api - Timeout: %s" % e)
-        except RuntimeError as e:
-            self._available = False
-            _LOGGER.exception("Error retrieving data from smart meter api - Error: %s" % e)
+                    return
+        self._available = True
+        self._updatets = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
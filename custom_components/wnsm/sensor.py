@@ -2,7 +2,6 @@
 WienerNetze Smartmeter sensor platform
 """
 import collections.abc
-from datetime import timedelta
 from typing import Optional
 
 import homeassistant.helpers.config_validation as cv
@@ -22,11 +21,11 @@ from homeassistant.helpers.typing import (
     DiscoveryInfoType,
     HomeAssistantType,
 )
-from .const import CONF_ZAEHLPUNKTE
+from .api import Smartmeter
+from .const import CONF_ZAEHLPUNKTE, SCAN_INTERVAL
+from .coordinator import WnsmCoordinator
 from .statistics_sensor import StatisticsSensor
 from .live_sensor import LiveSensor
-# Time between updating data from Wiener Netze
-SCAN_INTERVAL = timedelta(minutes=60)
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Required(CONF_USERNAME): cv.string,
@@ -42,21 +41,24 @@ async def async_setup_entry(
     async_add_entities,
 ):
     """Setup sensors from a config entry created in the integrations UI."""
-    config = hass.data[DOMAIN][config_entry.entry_id]
+    config = config_entry.data
+    # created and refreshed for the first time in __init__.async_setup_entry
+    coordinator: WnsmCoordinator = hass.data[DOMAIN][config_entry.entry_id]
     live_sensors = [
-        LiveSensor(config[CONF_USERNAME], config[CONF_PASSWORD], zp["zaehlpunktnummer"])
+        LiveSensor(coordinator, zp["zaehlpunktnummer"])
         for zp in config[CONF_ZAEHLPUNKTE]
     ]
     historical_sensors = [
-        StatisticsSensor(config[CONF_USERNAME], config[CONF_PASSWORD], zp["zaehlpunktnummer"])
+        StatisticsSensor(coordinator, zp["zaehlpunktnummer"])
         for zp in config[CONF_ZAEHLPUNKTE]
     ]
-    async_add_entities(historical_sensors, update_before_add=True)
+    # Statistics sensors update as soon as their restored state is available
+    async_add_entities(historical_sensors)
     async_add_entities(live_sensors, update_before_add=True)
 
 
 async def async_setup_platform(
-    hass: HomeAssistantType,  # pylint: disable=unused-argument
+    hass: HomeAssistantType,
     config: ConfigType,
     async_add_entities: collections.abc.Callable,
     discovery_info: Optional[
@@ -64,6 +66,12 @@ async def async_setup_platform(
     ] = None,  # pylint: disable=unused-argument
 ) -> None:
     """Set up the sensor platform by adding it into configuration.yaml"""
-    live_sensor = LiveSensor(config[CONF_USERNAME], config[CONF_PASSWORD], config[CONF_DEVICE_ID])
-    historical_sensor = StatisticsSensor(config[CONF_USERNAME], config[CONF_PASSWORD], config[CONF_DEVICE_ID])
-    async_add_entities([live_sensor, historical_sensor], update_before_add=True)
+    # If the first refresh fails, sensors are unavailable until the next successful update
+    coordinator = WnsmCoordinator(
+        hass, Smartmeter(config[CONF_USERNAME], config[CONF_PASSWORD]), SCAN_INTERVAL
+    )
+    await coordinator.async_refresh()
+    live_sensor = LiveSensor(coordinator, config[CONF_DEVICE_ID])
+    historical_sensor = StatisticsSensor(coordinator, config[CONF_DEVICE_ID])
+    async_add_entities([live_sensor], update_before_add=True)
+    async_add_entities([historical_sensor])
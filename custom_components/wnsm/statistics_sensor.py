@@ -1,10 +1,16 @@
+import asyncio
+import functools
 import logging
 
 from homeassistant.components.recorder import get_instance
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity, RestoredExtraData
 
 from .api import Smartmeter
+from .api.errors import SmartmeterError
 from .base_sensor import BaseSensor
+from .coordinator import WnsmCoordinator
+from .utils import parse_timestamp
 
 from homeassistant.components.recorder.models import (
     StatisticData,
@@ -16,15 +22,41 @@ from homeassistant.components.recorder.statistics import (
 from decimal import Decimal
 from homeassistant.util import dt as dt_util
 from datetime import timedelta, timezone, datetime
+from itertools import accumulate
 from operator import itemgetter
 from collections import defaultdict
 
 _LOGGER = logging.getLogger(__name__)
 
+# Consumption is only available for full days
+BATCH_SIZE = timedelta(hours=24)
+# Maximum range of consumption queried with a single request
+MAX_QUERY_RANGE = timedelta(days=30)
+# Consumption is reported in Wh, statistics are stored in kWh
+THOUSAND = Decimal(1000)
 
-class StatisticsSensor(BaseSensor, SensorEntity):
-    def __init__(self, username: str, password: str, zaehlpunkt: str) -> None:
-        super().__init__(username, password, zaehlpunkt)
+
+class StatisticsSensor(BaseSensor, SensorEntity, RestoreEntity):
+    def __init__(self, coordinator: WnsmCoordinator, zaehlpunkt: str) -> None:
+        super().__init__(coordinator, zaehlpunkt)
+        self._last_historical_import: datetime | None = None
+        # Data before this datetime is known to not contain any granular data (no opt-in),
+        # thus it is never queried again. Survives restarts, see extra_restore_state_data
+        self._min_start: datetime | None = None
+
+    @property
+    def extra_restore_state_data(self) -> ExtraStoredData:
+        return RestoredExtraData({
+            "min_start": self._min_start.isoformat() if self._min_start is not None else None
+        })
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        last_extra_data = await self.async_get_last_extra_data()
+        if last_extra_data is not None and last_extra_data.as_dict().get("min_start") is not None:
+            self._min_start = datetime.fromisoformat(last_extra_data.as_dict()["min_start"])
+        # The first update has to wait for the restored data, see sensor.async_setup_entry
+        self.async_schedule_update_ha_state(force_refresh=True)
 
     @staticmethod
     def statistics(s: str) -> str:
@@ -47,6 +79,18 @@ class StatisticsSensor(BaseSensor, SensorEntity):
         """Return the unique ID of the sensor."""
         return StatisticsSensor.statistics(super().unique_id)
 
+    @staticmethod
+    def _wait_for_api(start: datetime) -> bool:
+        """
+        returns True if start is less than 24h ago, thus the API will not return any new data
+        """
+        delta_t = datetime.now(timezone.utc).replace(microsecond=0) - start.replace(microsecond=0)
+        if delta_t <= BATCH_SIZE:
+            _LOGGER.debug(
+                "Not querying the API, because last update is not older than 24 hours. Earliest update in %s" % (BATCH_SIZE - delta_t))
+            return True
+        return False
+
     async def async_update(self):
         """
         update sensor
@@ -67,11 +111,14 @@ class StatisticsSensor(BaseSensor, SensorEntity):
         )
         _LOGGER.debug("Last inserted stat: %s" % last_inserted_stat)
 
-        init_meter = False
+        start = None
+        _sum = None
 
         if len(last_inserted_stat) == 0 or len(last_inserted_stat[self._id]) == 0:
             # No previous data - start from scratch
-            init_meter = True
+            # If the previous attempt did not return any data, wait as well
+            if self._last_historical_import is not None and self._wait_for_api(self._last_historical_import):
+                return
         elif len(last_inserted_stat) == 1 and len(last_inserted_stat[self._id]) == 1:
             # Previous data found in the statistics table
             _sum = Decimal(last_inserted_stat[self._id][0]["sum"])
@@ -91,16 +138,15 @@ class StatisticsSensor(BaseSensor, SensorEntity):
                               last_inserted_stat,
                               type(last_inserted_stat[self._id][0]["end"]))
                 return
+            if self._min_start is not None and start < self._min_start:
+                _LOGGER.debug("Skipping data before %s, as it does not contain granular data", self._min_start)
+                start = self._min_start
             _LOGGER.debug("New starting datetime: %s", start)
 
             # Extra check to not strain the API too much:
             # If the last insert date is less than 24h away, simply exit here,
             # because we will not get any data from the API
-            min_wait = timedelta(hours=24)
-            delta_t = datetime.now(timezone.utc).replace(microsecond=0) - start.replace(microsecond=0)
-            if delta_t <= min_wait:
-                _LOGGER.debug(
-                    "Not querying the API, because last update is not older than 24 hours. Earliest update in %s" % (min_wait - delta_t))
+            if self._wait_for_api(start):
                 return
 
         else:
@@ -108,37 +154,71 @@ class StatisticsSensor(BaseSensor, SensorEntity):
             return
 
         try:
-            smartmeter = Smartmeter(self.username, self.password)
-            await self.hass.async_add_executor_job(smartmeter.login)
-            zaehlpunkt = await self.get_zaehlpunkt(smartmeter)
-            self._attr_extra_state_attributes = zaehlpunkt
-
-            if not self.is_active(zaehlpunkt):
-                self._available = False
-                _LOGGER.debug("Smartmeter %s is not active" % zaehlpunkt)
-                return
-            else:
-                self._available = True
-
-            # Collect hourly data
-            if init_meter:
-                _LOGGER.warning("Starting import of historical data. This might take some time.")
-                await self._import_historical_data(smartmeter)
-            else:
-                await self._import_statistics(smartmeter, start, _sum)
-
-            self._updatets = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-        except TimeoutError as e:
+            await self.with_smartmeter(functools.partial(self._update, start=start, total_usage=_sum))
+        except SmartmeterError as e:
             self._available = False
-            _LOGGER.warning("Error retrieving data from smart meter api - Timeout: %s" % e)
+            _LOGGER.warning("Error retrieving data from smart meter api - Error: %s" % e)
         except RuntimeError as e:
             self._available = False
             _LOGGER.exception("Error retrieving data from smart meter api - Error: %s" % e)
 
+    async def _update(self, smartmeter: Smartmeter, start: datetime | None, total_usage: Decimal | None):
+        """
+        update sensor using a logged-in client
+        If no start is given, the statistics are initialized with historical data
+        """
+        zaehlpunkt = self.get_zaehlpunkt()
+        self._attr_extra_state_attributes = zaehlpunkt
+
+        if not self.is_active(zaehlpunkt):
+            self._available = False
+            _LOGGER.debug("Smartmeter %s is not active" % zaehlpunkt)
+            return
+        else:
+            self._available = True
+
+        # Collect hourly data
+        if start is None:
+            _LOGGER.warning("Starting import of historical data. This might take some time.")
+            await self._import_historical_data(smartmeter)
+        else:
+            await self._import_statistics(smartmeter, start, total_usage)
+
+        self._updatets = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+
     async def _import_historical_data(self, smartmeter: Smartmeter):
         """Initialize the statistics by fetching three years of data"""
         recording = await self.get_historic_data(smartmeter)
+        # Aggregating up to three years of quarter-hourly values is done in the executor,
+        # to keep that work off the event loop
+        statistics = await self.hass.async_add_executor_job(self._historical_statistics, recording)
+
+        metadata = StatisticMetaData(
+            source="recorder",
+            statistic_id=self._id,
+            name=self.name,
+            unit_of_measurement=self._attr_unit_of_measurement,
+            has_mean=False,
+            has_sum=True,
+        )
+        _LOGGER.debug(metadata)
+
+        if len(statistics) == 0:
+            # No data is returned, possibly the smart meter is too new or not active yet...
+            _LOGGER.info("No historical data available for smart meter!")
+            # Do not query the API again for a while, see async_update
+            self._last_historical_import = datetime.now(timezone.utc)
+            return
 
+        _LOGGER.debug(f"Importing statistics from {statistics[0]} to {statistics[-1]}")
+        async_import_statistics(self.hass, metadata, statistics)
+
+    @staticmethod
+    def _historical_statistics(recording: dict) -> list[StatisticData]:
+        """
+        Aggregate quarter-hourly historic data to hourly statistics
+        Blocking, has to be run in the executor
+        """
         factor = 1.0
         if recording['unitOfMeasurement'] == 'WH':
             factor = 1e-3
@@ -149,8 +229,8 @@ class StatisticsSensor(BaseSensor, SensorEntity):
 
         for value in recording['values']:
             reading = Decimal(value['messwert'] * factor)
-            ts = dt_util.parse_datetime(value['zeitVon'])
-            ts_to = dt_util.parse_datetime(value['zeitBis'])
+            ts = parse_timestamp(value['zeitVon'])
+            ts_to = parse_timestamp(value['zeitBis'])
             qual = value['qualitaet']
             if qual != 'VAL':
                 _LOGGER.warning(f"Historic data with different quality than 'VAL' detected: {value}")
@@ -161,28 +241,33 @@ class StatisticsSensor(BaseSensor, SensorEntity):
             dates[ts.replace(minute=0)] += reading
 
         statistics = []
-        metadata = StatisticMetaData(
-            source="recorder",
-            statistic_id=self._id,
-            name=self.name,
-            unit_of_measurement=self._attr_unit_of_measurement,
-            has_mean=False,
-            has_sum=True,
-        )
-        _LOGGER.debug(metadata)
-
         total_usage = Decimal(0)
         for ts, usage in sorted(dates.items(), key=itemgetter(0)):
             total_usage += usage
             statistics.append(StatisticData(start=ts, sum=total_usage, state=usage))
-        
-        if len(statistics) == 0:
-             # No data is returned, possibly the smart meter is too new or not active yet...
-            _LOGGER.info("No historical data available for smart meter!")
-            return
+        return statistics
 
-        _LOGGER.debug(f"Importing statistics from {statistics[0]} to {statistics[-1]}")
-        async_import_statistics(self.hass, metadata, statistics)
+    async def _split_without_opt_in(
+        self, smartmeter: Smartmeter, ranges: list[tuple[datetime, datetime]], consumptions: list
+    ) -> tuple[list[tuple[datetime, datetime]], list]:
+        """
+        Opt-in might have been set within a range reported without opt-in,
+        thus query such ranges per day, to only skip the days which do not contain granular data
+        """
+        split_ranges = []
+        split_consumptions = []
+        for (start, end), consumption in zip(ranges, consumptions):
+            if not isinstance(consumption, dict) or consumption.get('optIn') is not False or end - start <= BATCH_SIZE:
+                split_ranges.append((start, end))
+                split_consumptions.append(consumption)
+                continue
+            days = [(start + i * BATCH_SIZE, start + (i + 1) * BATCH_SIZE) for i in range((end - start) // BATCH_SIZE)]
+            split_ranges.extend(days)
+            split_consumptions.extend(await asyncio.gather(
+                *(self.get_consumption(smartmeter, s, e) for s, e in days),
+                return_exceptions=True,
+            ))
+        return split_ranges, split_consumptions
 
     async def _import_statistics(self, smartmeter: Smartmeter, start: datetime, total_usage: Decimal):
         """Import hourly consumption data into the statistics module, using start date and sum"""
@@ -207,22 +292,54 @@ class StatisticsSensor(BaseSensor, SensorEntity):
 
         now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
         _LOGGER.debug("Selecting data up to %s" % now)
-        while start < now:
-            _LOGGER.debug("Select 24h of Data, using sum=%.3f, start=%s" % (total_usage, start))
-            consumption = await self.get_consumption(smartmeter, start)
+        # Only full batches of 24h can be queried
+        n_batches = (now - start) // BATCH_SIZE
+        if n_batches == 0:
+            _LOGGER.debug("Not querying the API, because there is no full batch of data since %s" % start)
+            return
+        # Query as many days as possible with a single request
+        end = start + n_batches * BATCH_SIZE
+        ranges = []
+        while start < end:
+            ranges.append((start, min(start + MAX_QUERY_RANGE, end)))
+            start += MAX_QUERY_RANGE
+
+        # All ranges are independent of each other, thus they can be queried concurrently.
+        # Accumulating the sum has to happen in order though.
+        consumptions = await asyncio.gather(
+            *(self.get_consumption(smartmeter, s, e) for s, e in ranges),
+            return_exceptions=True,
+        )
+        ranges, consumptions = await self._split_without_opt_in(smartmeter, ranges, consumptions)
+
+        # Ranges are only skipped if they cannot contain any data. A range failing (even after retrying)
+        # cannot be skipped, as it would leave a permanent gap in the statistics. Instead, everything
+        # before it is imported, and the next update continues from there.
+        failure: BaseException | None = None
+        for (start, end), consumption in zip(ranges, consumptions):
+            # gather also returns e.g. CancelledError, which is no Exception
+            if isinstance(consumption, BaseException):
+                failure = consumption
+                break
+            _LOGGER.debug("Got data from %s to %s, using sum=%.3f" % (start, end, total_usage))
             _LOGGER.debug(consumption)
             last_ts = start
-            start += timedelta(hours=24)  # Next batch. Setting this here should avoid endless loops
 
             if 'values' not in consumption:
                 _LOGGER.error(f"No values in API response! This likely indicates an API error. Original response: {consumption}")
-                return
+                break
 
             # Check if this batch of data is valid and contains hourly statistics:
-            if not consumption.get('optIn'):
-                # TODO: actually, we could insert zero-usage data here, to increase the start time
-                # for the next run. Otherwise, the same data is queried over and over.
+            if consumption.get('optIn') is None:
+                # Skipping this range would leave a permanent gap, as the next update starts after
+                # the last imported range. Import everything before it and try again next update.
+                _LOGGER.error(f"No opt-in status in API response! This likely indicates an API error. Original response: {consumption}")
+                break
+            if consumption.get('optIn') is False:
                 _LOGGER.warning(f"Data starting at {start} does not contain granular data! Opt-in was not set back then.")
+                # Remember this, otherwise the same data is queried over and over.
+                # Ranges without opt-in are split into single days, thus this skips exactly this day
+                self._min_start = max(end, self._min_start) if self._min_start is not None else end
                 continue
 
             # Can actually check, if the whole batch can be skipped.
@@ -230,15 +347,22 @@ class StatisticsSensor(BaseSensor, SensorEntity):
                 _LOGGER.debug("Batch of data does not contain any consumption, skipping")
                 continue
 
+            if len(consumption['values']) == 0:
+                continue
+
+            # Validate the batch first, parsing every timestamp only once
+            valid = []
+            invalid_batch = False
             for v in consumption['values']:
-                # Timestamp has to be aware of timezone, parse_datetime does that.
-                ts = dt_util.parse_datetime(v['timestamp'])
+                # Timestamp has to be aware of timezone, parse_timestamp does that.
+                ts = parse_timestamp(v['timestamp'])
                 if ts.minute != 0:
                     # This usually happens if the start date minutes are != 0
                     # However, we set them to 0 in this function, thus if this happens, the API has
                     # a problem...
                     _LOGGER.error("Minute of timestamp is non-zero, this must not happen!")
-                    return
+                    invalid_batch = True
+                    break
                 if ts < last_ts:
                     # This should prevent any issues with ambiguous values though...
                     _LOGGER.warning(f"Timestamp from API ({ts}) is less than previously collected timestamp ({last_ts}), ignoring value!")
@@ -252,15 +376,33 @@ class StatisticsSensor(BaseSensor, SensorEntity):
                     # However, it is not trivial (or even impossible?) to insert statistic values
                     # in between existing values, thus we can not do much.
                     continue
-                usage = Decimal(v['value'] / 1000.0)  # Convert to kWh ...
-                total_usage += usage  # ... and accumulate
                 if v['isEstimated']:
                     # Can we do anything special here?
-                    _LOGGER.debug("Estimated Value found for {ts}: {usage}")
+                    _LOGGER.debug(f"Estimated Value found for {ts}: {v['value']}")
+                valid.append((ts, v))
+
+            if invalid_batch:
+                # Import everything before this batch, like for failing ranges
+                break
+            if len(valid) == 0:
+                continue
 
-                statistics.append(StatisticData(start=ts, sum=total_usage, state=usage))
+            # Values are integral Wh, thus accumulate them as int and only convert the results to kWh
+            sums_wh = accumulate(v['value'] for _, v in valid)
+            statistics.extend(
+                StatisticData(
+                    start=ts,
+                    sum=total_usage + Decimal(sum_wh) / THOUSAND,
+                    state=Decimal(v['value']) / THOUSAND,
+                )
+                for (ts, v), sum_wh in zip(valid, sums_wh)
+            )
+            total_usage = statistics[-1]["sum"]
 
         _LOGGER.debug(statistics)
 
         # Import the statistics data
-        async_import_statistics(self.hass, metadata, statistics)
+        if statistics:
+            async_import_statistics(self.hass, metadata, statistics)
+        if failure is not None:
+            raise failure
@@ -2,9 +2,14 @@
 Utility functions and convenience methods to avoid boilerplate
 """
 from __future__ import annotations
-from functools import reduce
+import asyncio
 from datetime import timezone, timedelta, datetime
+from functools import lru_cache, wraps
 import logging
+import time
+from typing import Any, Callable, Hashable
+
+from . import const
 
 
 def today(tz: None | timezone = None) -> datetime:
@@ -23,13 +28,12 @@ def before(timestamp=None, days=1) -> datetime:
     return timestamp - timedelta(days=days)
 
 
-def strint(string: str) -> int | None:
+def parse_timestamp(timestamp: str) -> datetime:
     """
-    convenience function for easily convert None-able str to in
+    parse an ISO 8601 timestamp of the API (e.g. 2023-04-22T22:00:00.000Z)
+    much cheaper than homeassistant.util.dt.parse_datetime, which is relevant for large imports
     """
-    if string is not None and string.isdigit():
-        return int(string)
-    return string
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
 
 
 def is_valid_access(data: list | dict, accessor: str | int) -> bool:
@@ -44,16 +48,25 @@ def is_valid_access(data: list | dict, accessor: str | int) -> bool:
         return False
 
 
-def dict_path(path: str, dictionary: dict) -> str | None:
+@lru_cache(maxsize=None)
+def compile_path(path: str) -> tuple[str | int, ...]:
     """
-    convenience function for accessing nested attributes within a dict
+    split a path of nested accessors (separated by '.') into dict keys and list indices
+    """
+    return tuple(int(s) if s.isdigit() else s for s in path.split("."))
+
+
+def compiled_dict_path(path: tuple[str | int, ...], dictionary: dict) -> str | None:
     """
+    access nested attributes within a dict by an already compiled path (see compile_path)
+    """
+    value = dictionary
     try:
-        return reduce(
-            lambda acc, i: acc[i] if is_valid_access(acc, i) else None,
-            [strint(s) for s in path.split(".")],
-            dictionary,
-        )
+        for accessor in path:
+            if not is_valid_access(value, accessor):
+                return None
+            value = value[accessor]
+        return value
     except KeyError as exception:
         logging.warning("Could not find key '%s' in response", exception.args[0])
     except Exception as exception:  # pylint: disable=broad-except
@@ -61,6 +74,45 @@ def dict_path(path: str, dictionary: dict) -> str | None:
     return None
 
 
+def dict_path(path: str, dictionary: dict) -> str | None:
+    """
+    convenience function for accessing nested attributes within a dict
+    """
+    return compiled_dict_path(compile_path(path), dictionary)
+
+
+# attribute mappings with already compiled paths, by id of the mapping
+_COMPILED_ATTRS: dict[int, tuple[list, list[tuple[tuple[str | int, ...], str]]]] = {}
+
+
+def compile_attrs(
+    attrs_list: list[tuple[str, str]]
+) -> list[tuple[tuple[str | int, ...], str]]:
+    """
+    compile all paths of an attribute mapping once and reuse them on subsequent calls
+    """
+    compiled = _COMPILED_ATTRS.get(id(attrs_list))
+    # holding a reference to attrs_list makes sure that its id is not reused
+    if compiled is None or compiled[0] is not attrs_list:
+        compiled = (attrs_list, [(compile_path(src), dest) for src, dest in attrs_list])
+        _COMPILED_ATTRS[id(attrs_list)] = compiled
+    return compiled[1]
+
+
+# compile the mappings used for every response at import instead of on the first call
+for _attrs_list in (
+    const.ATTRS_ZAEHLPUNKT_CALL,
+    const.ATTRS_ZAEHLPUNKTE_CALL,
+    const.ATTRS_CONSUMPTIONS_CALL,
+    const.ATTRS_BASEINFORMATION_CALL,
+    const.ATTRS_METERREADINGS_CALL,
+    const.ATTRS_VERBRAUCH_CALL,
+    const.ATTRS_HISTORIC_DATA,
+    const.ATTRS_HISTORIC_MEASUREMENT,
+):
+    compile_attrs(_attrs_list)
+
+
 def translate_dict(
     dictionary: dict, attrs_list: list[tuple[str, str]]
 ) -> dict[str, str]:
@@ -69,8 +121,97 @@ def translate_dict(
     returns a dictionary including all "picked" attributes addressed by attrs_list
     """
     result = {}
-    for src, destination in attrs_list:
-        value = dict_path(src, dictionary)
+    for path, destination in compile_attrs(attrs_list):
+        value = compiled_dict_path(path, dictionary)
         if value is not None:
             result[destination] = value
     return result
+
+
+def ttl_cache(seconds: float) -> Callable[[Callable], Callable]:
+    """
+    decorator caching the results of a function (or coroutine function) by its arguments
+    for the given number of seconds
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cache: dict[Hashable, tuple[Any, float]] = {}
+
+        def lookup(key: Hashable) -> tuple[Any, float] | None:
+            now = time.monotonic()
+            # expired entries are dropped, to not keep their arguments alive
+            for expired in [k for k, (_, expiry) in cache.items() if expiry <= now]:
+                del cache[expired]
+            return cache.get(key)
+
+        def store(key: Hashable, value: Any) -> Any:
+            cache[key] = (value, time.monotonic() + seconds)
+            return value
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = (args, tuple(sorted(kwargs.items())))
+                cached = lookup(key)
+                if cached is not None:
+                    return cached[0]
+                return store(key, await func(*args, **kwargs))
+
+            async_wrapper.cache_clear = cache.clear
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            cached = lookup(key)
+            if cached is not None:
+                return cached[0]
+            return store(key, func(*args, **kwargs))
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+class RateLimiter:
+    """
+    token bucket limiting the rate and the number of concurrent calls to the API
+    usage: async with limiter: ...
+    """
+
+    def __init__(self, rate: float, max_tokens: int, max_concurrent: int) -> None:
+        self.rate = rate
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+
+    def _add_new_tokens(self) -> None:
+        now = time.monotonic()
+        new_tokens = (now - self.updated_at) * self.rate
+        if self.tokens + new_tokens >= 1:
+            self.tokens = min(self.tokens + new_tokens, self.max_tokens)
+            self.updated_at = now
+
+    async def wait_for_token(self) -> None:
+        """
+        wait until a token is available and consume it
+        """
+        while self.tokens < 1:
+            self._add_new_tokens()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        self.tokens -= 1
+
+    async def __aenter__(self) -> RateLimiter:
+        await self.semaphore.acquire()
+        try:
+            await self.wait_for_token()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.semaphore.release()
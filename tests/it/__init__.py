@@ -185,6 +185,28 @@ def verbrauch_raw_response():
     }
     }
 
+def verbrauch_raw_hourly_response(date_from: dt.datetime, days: int):
+    # Same shape as the daily response, with one value per hour.
+    # Not recorded from the API: hourly granularity of verbrauchRaw is unverified
+    values = [
+        {
+            "value": 100 + hour % 24,
+            "timestamp": _dt_string(date_from + dt.timedelta(hours=hour)),
+            "isEstimated": False
+        }
+        for hour in range(24 * days)
+    ]
+    return {
+        "quarter-hour-opt-in": True,
+        "values": values,
+        "statistics": {
+            "maximum": max(v["value"] for v in values),
+            "minimum": min(v["value"] for v in values),
+            "average": sum(v["value"] for v in values) // len(values)
+        }
+    }
+
+
 def history_response(zp: str):
     return [
         {
@@ -358,7 +380,8 @@ def expect_zaehlpunkte(requests_mock: Mocker, zps: list[dict]):
                       json=zaehlpunkt_response(zps))
 
 @pytest.mark.usefixtures("requests_mock")
-def expect_verbrauch_raw(requests_mock: Mocker, zp: str, dateFrom: dt.datetime, dateTo: dt.datetime, response: dict, granularity = 'DAY'):
+def expect_verbrauch_raw(requests_mock: Mocker, zp: str, dateFrom: dt.datetime, dateTo: dt.datetime, response: dict, granularity = 'DAY',
+                         status: int | None = 200):
     params = {
         "dateFrom":     _dt_string(dateFrom),
         "dateTo":       _dt_string(dateTo),
@@ -366,12 +389,15 @@ def expect_verbrauch_raw(requests_mock: Mocker, zp: str, dateFrom: dt.datetime,
     }
     path = f'messdaten/zaehlpunkt/{zp}/verbrauchRaw?{urllib3.request.urlencode(params)}'
     print("MOCK: ", API_URL_B2C + path)
+    if status is None:
+        requests_mock.get(API_URL_B2C + path, exc=requests.exceptions.ConnectTimeout)
+        return
     requests_mock.get(API_URL_B2C + path,
                       headers={
                           "Authorization": f"Bearer {ACCESS_TOKEN}",
                           "X-Gateway-APIKey": B2C_API_KEY,
                       },
-                      json=response)
+                      json=response, status_code=status)
 
 
 @pytest.mark.usefixtures("requests_mock")
@@ -10,6 +10,7 @@ from it import (
     smartmeter,
     expect_zaehlpunkte,
     verbrauch_raw_response,
+    verbrauch_raw_hourly_response,
     zaehlpunkt,
     enabled,
     disabled,
@@ -21,7 +22,7 @@ from it import (
     mock_get_api_key,
     expect_history,
 )
-from wnsm.api.errors import SmartmeterConnectionError, SmartmeterLoginError
+from wnsm.api.errors import SmartmeterApiError, SmartmeterConnectionError, SmartmeterLoginError, SmartmeterTransportError
 
 
 @pytest.mark.usefixtures("requests_mock")
@@ -151,6 +152,20 @@ def test_access_key_expired(requests_mock):
     assert 'Access Token is not valid anymore' in str(exc_info.value)
 
 
+@pytest.mark.usefixtures("requests_mock")
+def test_login_expired(requests_mock):
+    mock_login_page(requests_mock)
+    mock_authenticate(requests_mock, USERNAME, PASSWORD)
+    mock_token(requests_mock, expires=1)
+    mock_get_api_key(requests_mock)
+    sm = smartmeter(username=USERNAME, password=PASSWORD)
+    assert sm.is_login_expired()
+    sm.login()
+    assert not sm.is_login_expired()
+    time.sleep(2)
+    assert sm.is_login_expired()
+
+
 @pytest.mark.usefixtures("requests_mock")
 def test_zaehlpunkte(requests_mock: Mocker):
     expect_login(requests_mock)
@@ -188,3 +203,63 @@ def test_verbrauch_raw(requests_mock: Mocker):
     verbrauch = smartmeter().login().verbrauch_raw(dateFrom, dateTo, zp)
 
     assert 7 == len(verbrauch['values'])
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_verbrauch_range(requests_mock: Mocker):
+
+    dateFrom = dt.datetime(2023, 4, 21, 22, 00, 00)
+    dateTo   = dt.datetime(2023, 4, 24, 21, 59, 59)
+    zp       = "AT000000001234567890"
+    expect_login(requests_mock)
+    expect_verbrauch_raw(requests_mock, zp, dateFrom, dateTo, verbrauch_raw_hourly_response(dateFrom, 3), granularity='HOUR')
+
+    verbrauch = smartmeter().login().verbrauch_range(dateFrom, dateTo, zp)
+
+    assert 72 == len(verbrauch['values'])
+    assert '2023-04-21T22:00:00.000Z' == verbrauch['values'][0]['timestamp']
+    assert '2023-04-21T23:00:00.000Z' == verbrauch['values'][1]['timestamp']
+    assert '2023-04-24T21:00:00.000Z' == verbrauch['values'][-1]['timestamp']
+    assert verbrauch['quarter-hour-opt-in']
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_verbrauch_range_api_error(requests_mock: Mocker):
+
+    dateFrom = dt.datetime(2023, 4, 21, 22, 00, 00)
+    dateTo   = dt.datetime(2023, 5,  1, 21, 59, 59)
+    zp       = "AT000000001234567890"
+    expect_login(requests_mock)
+    expect_verbrauch_raw(requests_mock, zp, dateFrom, dateTo, {"Exception": "Something went wrong"}, granularity='HOUR')
+
+    with pytest.raises(SmartmeterApiError) as exc_info:
+        smartmeter().login().verbrauch_range(dateFrom, dateTo, zp)
+    assert 'returned an error' in str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_verbrauch_range_timeout(requests_mock: Mocker):
+
+    dateFrom = dt.datetime(2023, 4, 21, 22, 00, 00)
+    dateTo   = dt.datetime(2023, 5,  1, 21, 59, 59)
+    zp       = "AT000000001234567890"
+    expect_login(requests_mock)
+    expect_verbrauch_raw(requests_mock, zp, dateFrom, dateTo, {}, granularity='HOUR', status=None)
+
+    with pytest.raises(SmartmeterTransportError) as exc_info:
+        smartmeter().login().verbrauch_range(dateFrom, dateTo, zp)
+    assert 'Could not call API endpoint' in str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_verbrauch_range_unauthorized(requests_mock: Mocker):
+
+    dateFrom = dt.datetime(2023, 4, 21, 22, 00, 00)
+    dateTo   = dt.datetime(2023, 5,  1, 21, 59, 59)
+    zp       = "AT000000001234567890"
+    expect_login(requests_mock)
+    expect_verbrauch_raw(requests_mock, zp, dateFrom, dateTo, {}, granularity='HOUR', status=401)
+
+    with pytest.raises(SmartmeterConnectionError) as exc_info:
+        smartmeter().login().verbrauch_range(dateFrom, dateTo, zp)
+    assert 'please re-log' in str(exc_info.value)
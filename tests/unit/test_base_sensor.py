@@ -0,0 +1,105 @@
+"""base sensor tests"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from wnsm.statistics_sensor import StatisticsSensor
+
+START = datetime(2023, 1, 1, 19, tzinfo=timezone.utc)
+
+
+def values(start: datetime, hours: int, step=timedelta(hours=1)):
+    return [
+        {
+            "value": i,
+            "timestamp": (start + i * step).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "isEstimated": False,
+        }
+        for i in range(hours)
+    ]
+
+
+class FakeSmartmeter:
+    def __init__(self, verbrauch_range):
+        self.verbrauch_range_response = verbrauch_range
+        self.calls = []
+
+    def verbrauch_range(self, date_from, date_to, zaehlpunkt):
+        self.calls.append(("verbrauch_range", date_from))
+        return self.verbrauch_range_response
+
+    def verbrauch(self, date_from, zaehlpunkt):
+        self.calls.append(("verbrauch", date_from))
+        return {"quarter-hour-opt-in": True, "values": values(date_from, 24)}
+
+
+class FakeCoordinator:
+    verbrauch_range_hourly = True
+
+    async def async_call_api(self, func, *args):
+        return func(*args)
+
+
+class FakeCache:
+    async def async_get(self, start, end):
+        return None
+
+    async def async_set(self, start, end, consumption, until):
+        pass
+
+
+@pytest.fixture
+def sensor():
+    s = StatisticsSensor.__new__(StatisticsSensor)
+    s.coordinator = FakeCoordinator()
+    s.zaehlpunkt = "AT1"
+    s._consumption_cache = FakeCache()
+    return s
+
+
+def test_get_consumption_hourly(sensor):
+    smartmeter = FakeSmartmeter({"quarter-hour-opt-in": True, "values": values(START, 48)})
+    consumption = asyncio.run(sensor.get_consumption(smartmeter, START, START + timedelta(days=2)))
+    assert 48 == len(consumption["values"])
+    assert [("verbrauch_range", START)] == smartmeter.calls
+    assert sensor.coordinator.verbrauch_range_hourly
+
+
+def test_get_consumption_falls_back_to_daily_queries(sensor):
+    # one value per day, e.g. if the granularity is ignored
+    smartmeter = FakeSmartmeter({"quarter-hour-opt-in": True, "values": values(START, 2, timedelta(days=1))})
+    consumption = asyncio.run(sensor.get_consumption(smartmeter, START, START + timedelta(days=2)))
+    assert consumption["optIn"]
+    assert 48 == len(consumption["values"])
+    assert "2023-01-01T19:00:00.000Z" == consumption["values"][0]["timestamp"]
+    assert "2023-01-03T18:00:00.000Z" == consumption["values"][-1]["timestamp"]
+    assert [
+        ("verbrauch_range", START),
+        ("verbrauch", START),
+        ("verbrauch", START + timedelta(days=1)),
+    ] == smartmeter.calls
+    # subsequent calls query each day right away
+    assert not sensor.coordinator.verbrauch_range_hourly
+    smartmeter.calls.clear()
+    asyncio.run(sensor.get_consumption(smartmeter, START, START + timedelta(days=1)))
+    assert [("verbrauch", START)] == smartmeter.calls
+
+
+def test_get_consumption_without_opt_in_is_not_checked(sensor):
+    smartmeter = FakeSmartmeter({"quarter-hour-opt-in": False, "values": []})
+    consumption = asyncio.run(sensor.get_consumption(smartmeter, START, START + timedelta(days=2)))
+    assert consumption["optIn"] is False
+    assert sensor.coordinator.verbrauch_range_hourly
+
+
+@pytest.mark.parametrize("hours,step,expected", [
+    (24, timedelta(hours=1), True),
+    (23, timedelta(hours=1), False),
+    (25, timedelta(hours=1), False),
+    (1, timedelta(days=1), False),
+    (96, timedelta(minutes=15), False),
+])
+def test_is_hourly(hours, step, expected):
+    consumption = {"optIn": True, "values": values(START, hours, step)}
+    assert expected == StatisticsSensor.is_hourly(consumption, START, START + timedelta(days=1))
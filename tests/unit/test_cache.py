@@ -0,0 +1,110 @@
+"""cache tests"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from wnsm import cache
+
+START = datetime(2023, 1, 1, 19, tzinfo=timezone.utc)
+UNTIL = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeStore:
+    def __init__(self, hass, version, key):
+        self.data = None
+        self.saves = 0
+
+    async def async_load(self):
+        return self.data
+
+    def async_delay_save(self, data_func, delay):
+        self.data = data_func()
+        self.saves += 1
+
+
+@pytest.fixture
+def consumption_cache(monkeypatch):
+    monkeypatch.setattr(cache, "Store", FakeStore)
+    return cache.ConsumptionCache(None, "AT1")
+
+
+def consumption(start: datetime, hours: int, opt_in=True):
+    return {
+        "optIn": opt_in,
+        "values": [
+            {
+                "value": i,
+                "timestamp": (start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "isEstimated": False,
+            }
+            for i in range(hours)
+        ],
+    }
+
+
+def test_requery_of_same_range(consumption_cache):
+    async def run(c):
+        end = START + timedelta(days=30)
+        assert await c.async_get(START, end) is None
+        await c.async_set(START, end, consumption(START, 30 * 24), UNTIL)
+        cached = await c.async_get(START, end)
+        assert cached["optIn"]
+        assert 30 * 24 == len(cached["values"])
+        assert "2023-01-01T19:00:00.000Z" == cached["values"][0]["timestamp"]
+        assert "2023-01-31T18:00:00.000Z" == cached["values"][-1]["timestamp"]
+
+    asyncio.run(run(consumption_cache))
+
+
+def test_subrange(consumption_cache):
+    async def run(c):
+        await c.async_set(START, START + timedelta(days=3), consumption(START, 3 * 24), UNTIL)
+        cached = await c.async_get(START + timedelta(hours=5), START + timedelta(hours=29))
+        assert list(range(5, 29)) == [v["value"] for v in cached["values"]]
+        # one hour too many
+        assert await c.async_get(START - timedelta(hours=1), START + timedelta(hours=5)) is None
+        assert await c.async_get(START, START + timedelta(days=3, hours=1)) is None
+
+    asyncio.run(run(consumption_cache))
+
+
+def test_only_hours_before_until_are_cached(consumption_cache):
+    async def run(c):
+        until = START + timedelta(hours=10)
+        await c.async_set(START, START + timedelta(days=1), consumption(START, 24), until)
+        assert await c.async_get(START, until) is not None
+        assert await c.async_get(START, until + timedelta(hours=1)) is None
+
+    asyncio.run(run(consumption_cache))
+
+
+def test_without_opt_in_is_not_cached(consumption_cache):
+    async def run(c):
+        await c.async_set(START, START + timedelta(days=1), consumption(START, 24, opt_in=False), UNTIL)
+        await c.async_set(START, START + timedelta(days=1), {"optIn": True}, UNTIL)
+        assert await c.async_get(START, START + timedelta(hours=1)) is None
+        assert 0 == c._store.saves
+
+    asyncio.run(run(consumption_cache))
+
+
+def test_evict(consumption_cache):
+    async def run(c):
+        await c.async_set(START, START + timedelta(days=2), consumption(START, 48), UNTIL)
+        await c.async_evict(START + timedelta(days=1))
+        assert await c.async_get(START, START + timedelta(days=1)) is None
+        assert await c.async_get(START + timedelta(days=1), START + timedelta(days=2)) is not None
+        assert 24 == len(c._store.data)
+
+    asyncio.run(run(consumption_cache))
+
+
+def test_persisted(consumption_cache):
+    async def run(c):
+        await c.async_set(START, START + timedelta(days=1), consumption(START, 24), UNTIL)
+        restored = cache.ConsumptionCache(None, "AT1")
+        restored._store.data = c._store.data
+        assert 24 == len((await restored.async_get(START, START + timedelta(days=1)))["values"])
+
+    asyncio.run(run(consumption_cache))
@@ -0,0 +1,82 @@
+"""coordinator tests"""
+import asyncio
+
+import pytest
+
+from wnsm import coordinator
+from wnsm.api.errors import SmartmeterApiError, SmartmeterTransportError
+from wnsm.utils import RateLimiter
+
+
+class FakeHass:
+    async def async_add_executor_job(self, func, *args):
+        return func(*args)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(coordinator.asyncio, "sleep", sleep)
+    return sleeps
+
+
+@pytest.fixture
+def wnsm_coordinator():
+    # only the parts needed by async_call_api, without setting up Home Assistant
+    c = coordinator.WnsmCoordinator.__new__(coordinator.WnsmCoordinator)
+    c.hass = FakeHass()
+    c._rate_limiter = RateLimiter(1000, 1000, 5)
+    return c
+
+
+def failing(*errors):
+    calls = []
+
+    def func(value):
+        calls.append(value)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return value
+
+    return func, calls
+
+
+def test_call_api(wnsm_coordinator, sleeps):
+    func, calls = failing()
+    assert 42 == asyncio.run(wnsm_coordinator.async_call_api(func, 42))
+    assert [42] == calls
+    assert [] == sleeps
+
+
+@pytest.mark.parametrize("error", [
+    SmartmeterApiError("server error", code=503),
+    SmartmeterApiError("throttled", code=429),
+    SmartmeterTransportError("timeout"),
+])
+def test_call_api_retries_transient_errors(wnsm_coordinator, sleeps, error):
+    func, calls = failing(error, error)
+    assert 42 == asyncio.run(wnsm_coordinator.async_call_api(func, 42))
+    assert 3 == len(calls)
+    assert [coordinator.API_RETRY_DELAY, 2 * coordinator.API_RETRY_DELAY] == sleeps
+
+
+def test_call_api_gives_up(wnsm_coordinator, sleeps):
+    error = SmartmeterApiError("server error", code=500)
+    func, calls = failing(*[error] * coordinator.API_RETRIES)
+    with pytest.raises(SmartmeterApiError):
+        asyncio.run(wnsm_coordinator.async_call_api(func, 42))
+    assert coordinator.API_RETRIES == len(calls)
+    assert coordinator.API_RETRIES - 1 == len(sleeps)
+
+
+@pytest.mark.parametrize("code", [200, 400, 404])
+def test_call_api_does_not_retry_other_errors(wnsm_coordinator, sleeps, code):
+    func, calls = failing(SmartmeterApiError("error", code=code))
+    with pytest.raises(SmartmeterApiError):
+        asyncio.run(wnsm_coordinator.async_call_api(func, 42))
+    assert 1 == len(calls)
+    assert [] == sleeps
@@ -0,0 +1,175 @@
+"""statistics sensor tests"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from wnsm import statistics_sensor
+from wnsm.api.errors import SmartmeterApiError
+from wnsm.statistics_sensor import StatisticsSensor
+
+NOW = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+# 70 full days, i.e. ranges of 30, 30 and 10 days
+START = NOW - timedelta(days=70, hours=5)
+OPT_IN = START + timedelta(days=40)
+
+
+def consumption(start: datetime, end: datetime, opt_in=True):
+    hours = (end - start) // timedelta(hours=1)
+    response = {
+        "consumptionMinimum": 1000,
+        "consumptionMaximum": 1023,
+        "values": [
+            {
+                "value": 1000 + i % 24,
+                "timestamp": (start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "isEstimated": False,
+            }
+            for i in range(hours)
+        ],
+    }
+    if opt_in is not None:
+        response["optIn"] = opt_in
+    return response
+
+
+class Sensor:
+    """
+    StatisticsSensor with stubbed API calls
+    """
+
+    def __init__(self, get_consumption):
+        self.sensor = StatisticsSensor.__new__(StatisticsSensor)
+        self.sensor.hass = None
+        self.sensor._name = "AT1"
+        self.sensor._attr_extra_state_attributes = {}
+        self.sensor._attr_unit_of_measurement = "kWh"
+        self.sensor._min_start = None
+        self.calls = []
+
+        async def stub(smartmeter, start, end):
+            self.calls.append((start, end))
+            return get_consumption(start, end)
+
+        self.sensor.get_consumption = stub
+
+    def import_statistics(self):
+        asyncio.run(self.sensor._import_statistics(None, START, Decimal(10)))
+
+
+@pytest.fixture
+def imported(monkeypatch):
+    imported = []
+    monkeypatch.setattr(
+        statistics_sensor, "async_import_statistics",
+        lambda hass, metadata, statistics: imported.extend(statistics)
+    )
+    return imported
+
+
+def assert_continuous(statistics, first_start, last_end, total_usage=Decimal(10)):
+    assert first_start == statistics[0]["start"]
+    assert last_end - timedelta(hours=1) == statistics[-1]["start"]
+    for statistic in statistics:
+        assert statistic["start"].minute == 0
+        total_usage += statistic["state"]
+        assert total_usage == statistic["sum"]
+
+
+def test_import(imported):
+    sensor = Sensor(consumption)
+    sensor.import_statistics()
+    assert [
+        (START, START + timedelta(days=30)),
+        (START + timedelta(days=30), START + timedelta(days=60)),
+        (START + timedelta(days=60), START + timedelta(days=70)),
+    ] == sensor.calls
+    assert 70 * 24 == len(imported)
+    assert_continuous(imported, START, START + timedelta(days=70))
+    assert Decimal("1.023") == imported[23]["state"]
+    assert sensor.sensor._min_start is None
+
+
+def test_nothing_to_import(imported):
+    sensor = Sensor(consumption)
+    asyncio.run(sensor.sensor._import_statistics(None, NOW - timedelta(hours=23), Decimal(10)))
+    assert [] == sensor.calls
+    assert [] == imported
+
+
+def test_failing_range(imported):
+    def get_consumption(start, end):
+        if start == START + timedelta(days=30):
+            raise SmartmeterApiError("server error", code=500)
+        return consumption(start, end)
+
+    sensor = Sensor(get_consumption)
+    with pytest.raises(SmartmeterApiError):
+        sensor.import_statistics()
+    # everything before the failing range is imported, later ranges are not
+    assert 30 * 24 == len(imported)
+    assert_continuous(imported, START, START + timedelta(days=30))
+
+
+def test_cancelled_range(imported):
+    def get_consumption(start, end):
+        if start == START + timedelta(days=30):
+            raise asyncio.CancelledError()
+        return consumption(start, end)
+
+    with pytest.raises(asyncio.CancelledError):
+        Sensor(get_consumption).import_statistics()
+    assert 30 * 24 == len(imported)
+
+
+def test_invalid_timestamp(imported):
+    def get_consumption(start, end):
+        response = consumption(start, end)
+        if start == START + timedelta(days=30):
+            response["values"][5]["timestamp"] = response["values"][5]["timestamp"].replace(":00:00", ":30:00")
+        return response
+
+    Sensor(get_consumption).import_statistics()
+    assert 30 * 24 == len(imported)
+    assert_continuous(imported, START, START + timedelta(days=30))
+
+
+def test_opt_in_within_range(imported):
+    # The opt-in status of a range is the one at its start
+    def get_consumption(start, end):
+        return consumption(start, end, opt_in=start >= OPT_IN)
+
+    sensor = Sensor(get_consumption)
+    sensor.import_statistics()
+    # the ranges without opt-in are queried again per day
+    assert 3 + 60 == len(sensor.calls)
+    assert all(end - start == timedelta(days=1) for start, end in sensor.calls[3:])
+    # only the days without opt-in are skipped
+    assert OPT_IN == sensor.sensor._min_start
+    assert 30 * 24 == len(imported)
+    assert_continuous(imported, OPT_IN, START + timedelta(days=70))
+
+
+def test_opt_in_missing(imported):
+    def get_consumption(start, end):
+        return consumption(start, end, opt_in=None if start == START + timedelta(days=30) else True)
+
+    sensor = Sensor(get_consumption)
+    sensor.import_statistics()
+    # the range is not skipped, but retried with the next update
+    assert 30 * 24 == len(imported)
+    assert_continuous(imported, START, START + timedelta(days=30))
+    assert sensor.sensor._min_start is None
+
+
+def test_values_missing(imported):
+    def get_consumption(start, end):
+        response = consumption(start, end)
+        if start == START + timedelta(days=60):
+            del response["values"]
+        return response
+
+    Sensor(get_consumption).import_statistics()
+    assert 60 * 24 == len(imported)
+    assert_continuous(imported, START, START + timedelta(days=60))
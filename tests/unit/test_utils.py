@@ -0,0 +1,264 @@
+"""utils tests"""
+import asyncio
+
+import pytest
+
+from wnsm import utils
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(utils.time, "monotonic", clock)
+    return clock
+
+
+def test_ttl_cache_hit(clock):
+    calls = []
+
+    @utils.ttl_cache(60)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    assert 4 == double(2)
+    assert 4 == double(2)
+    assert 6 == double(3)
+    assert [2, 3] == calls
+
+
+def test_ttl_cache_expiry(clock):
+    calls = []
+
+    @utils.ttl_cache(60)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    double(2)
+    clock.now += 59
+    double(2)
+    assert [2] == calls
+    clock.now += 1
+    double(2)
+    assert [2, 2] == calls
+
+
+def test_ttl_cache_keyword_arguments(clock):
+    calls = []
+
+    @utils.ttl_cache(60)
+    def add(x, y=0):
+        calls.append((x, y))
+        return x + y
+
+    assert 3 == add(1, y=2)
+    assert 3 == add(1, y=2)
+    assert 1 == add(1)
+    assert [(1, 2), (1, 0)] == calls
+
+
+def test_ttl_cache_async(clock):
+    calls = []
+
+    @utils.ttl_cache(60)
+    async def double(x):
+        calls.append(x)
+        return 2 * x
+
+    assert asyncio.iscoroutinefunction(double)
+    assert 4 == asyncio.run(double(2))
+    assert 4 == asyncio.run(double(2))
+    clock.now += 60
+    assert 4 == asyncio.run(double(2))
+    assert [2, 2] == calls
+
+
+def test_ttl_cache_does_not_cache_exceptions(clock):
+    calls = []
+
+    @utils.ttl_cache(60)
+    def fail(x):
+        calls.append(x)
+        raise RuntimeError(x)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            fail(1)
+    assert [1, 1] == calls
+
+
+def test_ttl_cache_clear(clock):
+    calls = []
+
+    @utils.ttl_cache(60)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    double(2)
+    double.cache_clear()
+    double(2)
+    assert [2, 2] == calls
+
+
+@pytest.fixture
+def sleeps(monkeypatch, clock):
+    """
+    asyncio.sleep advancing the fake clock instead of waiting
+    """
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        sleeps.append(delay)
+        clock.now += delay
+        await real_sleep(0)
+
+    monkeypatch.setattr(utils.asyncio, "sleep", sleep)
+    return sleeps
+
+
+def test_rate_limiter_burst(clock, sleeps):
+    async def run():
+        limiter = utils.RateLimiter(rate=2, max_tokens=3, max_concurrent=10)
+        for _ in range(3):
+            async with limiter:
+                pass
+        assert [] == sleeps
+        async with limiter:
+            pass
+        assert sum(sleeps) == pytest.approx(0.5)
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_refill_rate(clock, sleeps):
+    async def run():
+        limiter = utils.RateLimiter(rate=2, max_tokens=2, max_concurrent=10)
+        start = clock.now
+        for _ in range(2 + 10):
+            async with limiter:
+                pass
+        # the burst is free, every further call has to wait for a new token
+        assert clock.now - start == pytest.approx(10 / 2)
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_refill_is_capped(clock, sleeps):
+    async def run():
+        limiter = utils.RateLimiter(rate=2, max_tokens=2, max_concurrent=10)
+        for _ in range(2):
+            async with limiter:
+                pass
+        # a long pause does not refill more than max_tokens
+        clock.now += 100
+        for _ in range(3):
+            async with limiter:
+                pass
+        assert sum(sleeps) == pytest.approx(0.5)
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_concurrency():
+    active = 0
+    max_active = 0
+
+    async def call(limiter):
+        nonlocal active, max_active
+        async with limiter:
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def run():
+        limiter = utils.RateLimiter(rate=1000, max_tokens=1000, max_concurrent=2)
+        await asyncio.gather(*(call(limiter) for _ in range(6)))
+        assert not limiter.semaphore.locked()
+
+    asyncio.run(run())
+    assert 2 == max_active
+
+
+def test_rate_limiter_releases_on_cancel():
+    async def run():
+        limiter = utils.RateLimiter(rate=0.001, max_tokens=1, max_concurrent=1)
+        await limiter.wait_for_token()
+
+        async def call():
+            async with limiter:
+                pass
+
+        task = asyncio.create_task(call())
+        await asyncio.sleep(0.01)
+        # waiting for a token, while holding the only slot
+        assert limiter.semaphore.locked()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not limiter.semaphore.locked()
+
+    asyncio.run(run())
+
+
+def test_compile_path():
+    assert ("a",) == utils.compile_path("a")
+    assert ("a", 0, "b") == utils.compile_path("a.0.b")
+    assert utils.compile_path("a.0.b") is utils.compile_path("a.0.b")
+
+
+RESPONSE = {
+    "name": "zp",
+    "list": [{"value": 1}, {"value": None}],
+    "nested": {"key": "value"},
+    "text": "abc",
+}
+
+
+@pytest.mark.parametrize("path,expected", [
+    ("name", "zp"),
+    ("nested.key", "value"),
+    ("list.0.value", 1),
+    ("list.1.value", None),
+    ("list.2.value", None),
+    ("missing", None),
+    ("missing.key", None),
+    ("nested.key.deeper", None),
+    ("list.value", None),
+    ("nested.0", None),
+    # an index into a string does not return a character
+    ("text.0", None),
+])
+def test_dict_path(path, expected):
+    assert expected == utils.dict_path(path, RESPONSE)
+
+
+def test_translate_dict():
+    attrs = [
+        ("name", "name"),
+        ("nested.key", "key"),
+        ("list.0.value", "first"),
+        ("list.1.value", "second"),
+        ("list.5.value", "sixth"),
+        ("text.0", "character"),
+        ("missing.key", "missing"),
+    ]
+    assert {"name": "zp", "key": "value", "first": 1} == utils.translate_dict(RESPONSE, attrs)
+    # compiled paths are reused for the same mapping
+    assert utils.compile_attrs(attrs) is utils.compile_attrs(attrs)
+
+
+def test_translate_dict_of_list_response():
+    assert {} == utils.translate_dict([RESPONSE], [("name", "name")])
+    assert {} == utils.translate_dict(None, [("name", "name")])